@@ -0,0 +1,186 @@
+import functools
+import http.server
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from toc_checker import (TOCChecker, cached_pdf_path, check_pdf_file, check_pdf_in_worker,
+                         detect_toc_pattern, fetch_pdf, fitz, init_checker_worker)
+
+
+def test_dotted_leader_line_matches_mid_page():
+    text = "Some heading\n\nIntroducción ....... 12\nMore text"
+    assert detect_toc_pattern(text)
+
+
+def test_spaced_leader_line_matches_mid_page():
+    text = "Some heading\nMetodología      5\nMore text"
+    assert detect_toc_pattern(text)
+
+
+def test_leader_line_does_not_cross_newline():
+    assert not detect_toc_pattern("Introducción\n....... 12")
+    assert not detect_toc_pattern("Introducción\n      12")
+
+
+def test_numbered_line_does_not_cross_newline():
+    assert detect_toc_pattern("Intro\n1 Introducción\nmore")
+    assert not detect_toc_pattern("1\nIntroducción")
+
+
+def test_plain_prose_does_not_match():
+    assert not detect_toc_pattern("nothing here at all\nnope")
+
+
+def test_long_whitespace_line_is_rejected():
+    # Ambiguous whitespace handling used to make this take seconds
+    assert not detect_toc_pattern(" " * 16000)
+    assert not detect_toc_pattern("Title" + " " * 16000 + "12x")
+
+
+def make_pdf(first_page_text, pages=12):
+    """Build a PDF long enough to be checked, with the given text on its first page"""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), first_page_text if page_num == 0 else "Body text", fontsize=11)
+    pdf_content = doc.tobytes()
+    doc.close()
+    return pdf_content
+
+
+def test_toc_page_is_detected():
+    assert TOCChecker().is_toc_present(make_pdf("Índice\nIntroducción ....... 3"))
+
+
+def test_keywords_are_matched_case_insensitively():
+    assert TOCChecker().is_toc_present(make_pdf("sumario\nIntroducción ....... 3"))
+
+
+def test_direct_keyword_list_changes_are_used():
+    toc_checker = TOCChecker()
+    pdf_content = make_pdf("Resumen\nIntroducción ....... 3")
+    assert not toc_checker.is_toc_present(pdf_content)
+
+    toc_checker.keywords.append("Resumen")
+    assert toc_checker.is_toc_present(pdf_content)
+
+    toc_checker.keywords = ["Agenda"]
+    assert not toc_checker.is_toc_present(make_pdf("Índice\nIntroducción ....... 3"))
+
+
+def test_empty_keyword_list_never_matches():
+    toc_checker = TOCChecker()
+    toc_checker.keywords = []
+    assert not toc_checker.is_toc_present(make_pdf("Índice\nIntroducción ....... 3"))
+
+
+def test_extract_headings_detects_larger_keyword_heading():
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "ÍNDICE", fontsize=20)
+    page.insert_text((72, 120), "Body text", fontsize=11)
+    toc_checker = TOCChecker()
+
+    assert toc_checker.extract_headings(page, toc_checker.keywords)
+    assert toc_checker.extract_headings(page, ["índice"])
+    assert not toc_checker.extract_headings(page, ["Body"])
+
+
+@pytest.fixture
+def pdf_server(tmp_path):
+    """Serve files from a temporary directory over HTTP, yielding (directory, base URL)"""
+    served = tmp_path / "served"
+    served.mkdir()
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(served))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield served, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetched_pdf_is_cached_and_reused(tmp_path, pdf_server):
+    served, base_url = pdf_server
+    (served / "toc.pdf").write_bytes(make_pdf("Índice"))
+    cache_dir = str(tmp_path / "cache")
+
+    pdf_path = fetch_pdf(f"{base_url}/toc.pdf", cache_dir)
+    assert pdf_path == cached_pdf_path(f"{base_url}/toc.pdf", cache_dir)
+
+    (served / "toc.pdf").unlink()
+    assert fetch_pdf(f"{base_url}/toc.pdf", cache_dir) == pdf_path
+    assert os.listdir(cache_dir) == [os.path.basename(pdf_path)]
+
+
+def test_non_pdf_response_is_not_cached(tmp_path, pdf_server):
+    served, base_url = pdf_server
+    (served / "login.pdf").write_bytes(b"<html>Please log in</html>")
+    cache_dir = str(tmp_path / "cache")
+
+    assert fetch_pdf(f"{base_url}/login.pdf", cache_dir) is False
+    assert fetch_pdf(f"{base_url}/missing.pdf", cache_dir) is False
+    assert os.listdir(cache_dir) == []
+
+
+def test_unwritable_cache_does_not_raise(tmp_path, pdf_server):
+    served, base_url = pdf_server
+    (served / "toc.pdf").write_bytes(make_pdf("Índice"))
+    cache_file = tmp_path / "not-a-directory"
+    cache_file.write_text("")
+
+    assert fetch_pdf(f"{base_url}/toc.pdf", str(cache_file)) is False
+
+
+def test_unreadable_cached_pdf_is_removed(tmp_path):
+    pdf_path = tmp_path / "broken.pdf"
+    pdf_path.write_bytes(b"%PDF-1.7 not really")
+
+    assert check_pdf_file(TOCChecker(), str(pdf_path)) is None
+    assert not pdf_path.exists()
+
+
+def test_same_broken_cached_pdf_checked_twice(tmp_path):
+    pdf_path = tmp_path / "broken.pdf"
+    pdf_path.write_bytes(b"%PDF-1.7 not really")
+    toc_checker = TOCChecker()
+
+    assert check_pdf_file(toc_checker, str(pdf_path)) is None
+    assert check_pdf_file(toc_checker, str(pdf_path)) is None
+
+
+def test_cached_pdf_is_kept_when_check_raises(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "toc.pdf"
+    pdf_path.write_bytes(make_pdf("Índice"))
+    toc_checker = TOCChecker()
+
+    def interrupted(pdf_content):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(toc_checker, "is_toc_present", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        check_pdf_file(toc_checker, str(pdf_path))
+    assert pdf_path.exists()
+
+
+def test_worker_pool_checks_pdfs_with_initialized_checker(tmp_path):
+    toc_path = tmp_path / "toc.pdf"
+    toc_path.write_bytes(make_pdf("Resumen\nIntroducción ....... 3"))
+    plain_path = tmp_path / "plain.pdf"
+    plain_path.write_bytes(make_pdf("Just text"))
+    toc_checker = TOCChecker()
+    toc_checker.add_keywords(["Resumen"])
+
+    with ProcessPoolExecutor(max_workers=2,
+                             mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_checker_worker,
+                             initargs=(toc_checker,)) as checker_pool:
+        results = [checker_pool.submit(check_pdf_in_worker, str(toc_path)).result(),
+                   checker_pool.submit(check_pdf_in_worker, str(plain_path), True).result()]
+
+    assert results == [True, False]
+    assert toc_path.exists()
+    assert not plain_path.exists()
@@ -1,7 +1,48 @@
+import contextlib
+import hashlib
+import multiprocessing
+import os
 import re
+import sys
+import tempfile
 import requests
-import fitz  # PyMuPDF
+try:
+    # Newer PyMuPDF prints a deprecation notice to stdout on `import fitz`, once per
+    # spawned worker, which would end up mixed into the results
+    import pymupdf as fitz
+except ImportError:
+    import fitz  # PyMuPDF before 1.24.3
 import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+TOC_PATTERN = r'''
+        ^[^\S\n]*[\wÀ-ÿ]+(?:[^\S\n]{1,4}[\wÀ-ÿ]+)*     # Title words, separated by gaps of 1-4 spaces
+        (?:[^\S\n]{5,}|[^\S\n]*\.{2,}[^\S\n]*)          # followed by 5+ spaces or 2+ dots
+        \d+[^\S\n]*$|                                   # and ending with a page number
+        ^\d+[^\S\n]+[\wÀ-ÿ](?:[\wÀ-ÿ]|[^\S\n])*$|        # Numbered lines (1  Introduction)
+        (?:\b(?:\d+|[A-Za-z])[.:]|     # Numbered/lettered lists (1. Introduction, a. Intro, 1: Intro, A: Background)
+        \b[IVXLCDM]+\.|                # Roman numerals (I. Introduction, II. Methodology)
+        \((?:\d+|[A-Za-z])\)|          # Parenthesized numbers/letters ((1) Introduction, (A) Background)
+        [•\-])                         # Bullet points (• Introduction, - Methodology)
+        \s+\w+                         # Shared tail: whitespace then the entry's first word
+'''
+
+# Compiled once at import so repeated page scans don't re-parse the pattern.
+# MULTILINE makes ^/$ match per line; without it the line-anchored branches
+# could only ever match when the whole page was a single line.
+_TOC_RE = re.compile(TOC_PATTERN, re.VERBOSE | re.MULTILINE)
+
+
+# Downloaded PDFs are kept here between runs, named by a hash of their URL
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "toc_checker"
+)
+
+# Text extraction flags: image blocks are never decoded, ligatures and unusual
+# whitespace are normalized to plain characters, and text outside the page is skipped
+TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP
 
 
 def detect_toc_pattern(text):
@@ -13,21 +54,7 @@ def detect_toc_pattern(text):
     Returns:
         bool: True if a TOC-like pattern is found, False otherwise
     """
-    pattern = r'''
-            (^\d+\s+[\w\sÀ-ÿ]+$|           # Numbered lists (1  Introduction)
-            \b\d+\.\s+\w+|                # Numbered lists (1. Introduction)
-            \b[A-Z]\.\s+\w+|              # Uppercase lettered lists (A. Background)
-            \b[a-z]\.\s+\w+|              # Lowercase lettered lists (a. Introduction)
-            \(\d+\)\s+\w+|                # Parenthesized numbers ((1) Introduction)
-            \([A-Za-z]\)\s+\w+|           # Parenthesized letters ((A) Background)
-            [•\-]\s+\w+|                  # Bullet points (• Introduction, - Methodology)
-            \b[IVXLCDM]+\.\s+\w+|         # Roman numerals (I. Introduction, II. Methodology)
-            \b\d+:\s+\w+|                 # Numbered lists with colons (1: Introduction)
-            \b[A-Za-z]:\s+\w+)            # Lettered lists with colons (A: Background)
-            |
-            ^[\w\sÀ-ÿ]+(?:\s{5,}|\.{2,})\d+$  # Text followed by 5+ spaces or 2+ dots, ending with a number
-    '''
-    return bool(re.search(pattern, text, re.VERBOSE))
+    return _TOC_RE.search(text) is not None
 
 
 class TOCChecker:
@@ -49,6 +76,7 @@ class TOCChecker:
             "índice",
             "SUMARIO"
         ]
+        self._compiled_keywords = None
 
     def add_keywords(self, new_keywords):
         """Add additional keywords to check for TOC
@@ -58,54 +86,77 @@ class TOCChecker:
         """
         self.keywords.extend(new_keywords)
 
-    def extract_headings(self, page, keywords):
+    def _compile_keywords(self):
+        """Refresh the casefolded keywords and the regex matching any of them
+
+        A single regex lets a page be scanned once, not once per keyword. Both are rebuilt
+        whenever `keywords` has changed since they were last compiled, so direct edits
+        to the list are picked up too; with no keywords the regex is None.
+        """
+        if self._compiled_keywords != self.keywords:
+            # Keywords are casefolded so case variants ("INDICE", "Indice", ...) collapse into one
+            # entry; sorting keeps the regex source the same across runs and processes
+            self._keywords_folded = sorted(
+                {keyword.casefold() for keyword in self.keywords},
+                key=lambda keyword: (-len(keyword), keyword)
+            )
+            self._keywords_re = (re.compile("|".join(map(re.escape, self._keywords_folded)))
+                                 if self._keywords_folded else None)
+            self._compiled_keywords = list(self.keywords)
+
+    def extract_headings(self, page, keywords, textpage=None):
         """Check if the keywords have different formatting compared to other text on the page
 
         Args:
             page (fitz.Page): A PDF page object from PyMuPDF
             keywords (list): List of keywords to check for unique formatting
+            textpage (fitz.TextPage, optional): Already extracted text of the page, reused
+                instead of parsing the page again
 
         Returns:
             bool: True if keywords have different formatting, False otherwise
         """
-        blocks = page.get_text("dict")["blocks"]
-        keyword_formatting = []
-        other_formatting = []
+        blocks = page.get_text("dict", textpage=textpage)["blocks"]
+        if keywords is self.keywords:
+            self._compile_keywords()
+            keywords_folded = self._keywords_folded
+        else:
+            keywords_folded = {keyword.casefold() for keyword in keywords}
+        # Running totals instead of per-span records: only sums, counts, font sets
+        # and a bold flag are needed for the comparison below
+        keyword_size_sum, keyword_count, keyword_fonts, keyword_bold = 0, 0, set(), False
+        other_size_sum, other_count, other_fonts, other_bold = 0, 0, set(), False
 
         for block in blocks:
             if "lines" in block:
                 for line in block["lines"]:
                     if "spans" in line:
                         for span in line["spans"]:
-                            text = span["text"].strip()
+                            text = span["text"].strip().casefold()
                             size = span["size"]
                             font = span["font"]
                             is_bold = "bold" in font.lower()
 
-                            if any(keyword.lower() in text.lower() for keyword in keywords):
-                                keyword_formatting.append({
-                                    "size": size,
-                                    "font": font,
-                                    "bold": is_bold
-                                })
+                            if any(keyword in text for keyword in keywords_folded):
+                                keyword_size_sum += size
+                                keyword_count += 1
+                                keyword_fonts.add(font)
+                                keyword_bold = keyword_bold or is_bold
                             else:
-                                other_formatting.append({
-                                    "size": size,
-                                    "font": font,
-                                    "bold": is_bold
-                                })
+                                other_size_sum += size
+                                other_count += 1
+                                other_fonts.add(font)
+                                other_bold = other_bold or is_bold
 
-        avg_keyword_size = sum(f["size"] for f in keyword_formatting) / len(keyword_formatting)
-        avg_other_size = sum(f["size"] for f in other_formatting) / len(other_formatting) if other_formatting else 0
-
-        keyword_fonts = set(f["font"] for f in keyword_formatting)
-        other_fonts = set(f["font"] for f in other_formatting) if other_formatting else set()
+        # The keyword may have been split across spans, leaving nothing to compare
+        if not keyword_count:
+            return False
 
-        keyword_bold = any(f["bold"] for f in keyword_formatting)
-        other_bold = any(f["bold"] for f in other_formatting) if other_formatting else False
+        avg_keyword_size = keyword_size_sum / keyword_count
+        avg_other_size = other_size_sum / other_count if other_count else 0
 
         if (avg_keyword_size > avg_other_size or
-                keyword_fonts - other_fonts or
+                not keyword_fonts <= other_fonts or
                 keyword_bold and not other_bold):
             return True
 
@@ -115,43 +166,174 @@ class TOCChecker:
         """Check if TOC is present in the PDF content and match headings with keywords
 
         Args:
-            pdf_content (bytes): PDF content as bytes
+            pdf_content (bytes or str): PDF content as bytes, or path to a PDF file
 
         Returns:
             bool: True if TOC is present and headings match keywords, False otherwise
             None: If the PDF is corrupted or cannot be opened
         """
+        self._compile_keywords()
+        keywords_re = self._keywords_re
         try:
-            with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+            if isinstance(pdf_content, (bytes, bytearray, memoryview)):
+                doc = fitz.open(stream=pdf_content, filetype="pdf")
+            else:
+                doc = fitz.open(pdf_content, filetype="pdf")
+            with doc:
                 if len(doc) > 10:
                     for page_num in range(min(10, len(doc))):
                         page = doc.load_page(page_num)
-                        text = page.get_text("text")
-                        if any(keyword in text for keyword in self.keywords):
-                            if self.extract_headings(page, self.keywords) or detect_toc_pattern(text):
+                        # Parse the page once; both the plain text and the span dict come from it
+                        textpage = page.get_textpage(flags=TEXT_FLAGS)
+                        text = textpage.extractText()
+                        if keywords_re and keywords_re.search(text.casefold()):
+                            # The regex runs on text already in hand; the span dict is only
+                            # built when it doesn't settle the page
+                            if (detect_toc_pattern(text) or
+                                    self.extract_headings(page, self.keywords, textpage)):
                                 return True
             return False
-        except fitz.FileDataError:
+        except (fitz.FileDataError, fitz.FileNotFoundError):
             return None
 
 
-def fetch_pdf(url):
-    """Fetch PDF content from a URL
+def cached_pdf_path(url, cache_dir):
+    """Get the path a URL's PDF is cached under
 
     Args:
         url (str): URL of the PDF file
+        cache_dir (str): Directory holding cached PDFs
 
     Returns:
-        bytes: PDF content as bytes, or None if the request fails
+        str: Path of the cache file for the URL
     """
+    name = hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+    return os.path.join(cache_dir, f"{name}.pdf")
+
+
+def fetch_pdf(url, cache_dir=None):
+    """Fetch a PDF from a URL into a file on disk
+
+    The body is streamed to disk in chunks so the whole PDF never has to sit in
+    memory. With a cache_dir the PDF is stored there and reused on later calls
+    without touching the network; otherwise it goes to a temporary file the
+    caller is responsible for removing. Responses that aren't PDFs are never kept.
+
+    Args:
+        url (str): URL of the PDF file
+        cache_dir (str, optional): Directory to cache downloaded PDFs in
+
+    Returns:
+        str: Path to the downloaded PDF file, or False if the request fails
+    """
+    if cache_dir:
+        cache_path = cached_pdf_path(url, cache_dir)
+        if os.path.exists(cache_path):
+            return cache_path
+
+    pdf_path = None
+    downloaded = False
     try:
-        response = requests.get(url, stream=True, timeout=15)
-        if response.status_code == 200:
-            return response.content
-        else:
-            return False
-    except requests.exceptions.RequestException as e:
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with requests.get(url, stream=True, timeout=15) as response:
+            if response.status_code == 200:
+                with tempfile.NamedTemporaryFile(suffix=".pdf", dir=cache_dir, delete=False) as file:
+                    pdf_path = file.name
+                    for chunk in response.iter_content(chunk_size=65536):
+                        file.write(chunk)
+                # HTML error pages and login walls come back as 200 too
+                if not is_pdf_file(pdf_path):
+                    return False
+                if cache_dir:
+                    # Only complete downloads ever appear under the cache name
+                    os.replace(pdf_path, cache_path)
+                    downloaded = True
+                    return cache_path
+                downloaded = True
+                return pdf_path
+            else:
+                return False
+    except (requests.exceptions.RequestException, OSError) as e:
         return False
+    finally:
+        # Covers failed downloads, non-PDF bodies and interrupts alike
+        if pdf_path and not downloaded:
+            try:
+                os.remove(pdf_path)
+            except OSError:
+                pass
+
+
+def is_pdf_file(file_path):
+    """Check whether a file looks like a PDF
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        bool: True if the PDF header is found near the start of the file, False otherwise
+    """
+    with open(file_path, "rb") as file:
+        # Readers accept a PDF header anywhere in the first 1024 bytes
+        return b"%PDF-" in file.read(1024)
+
+
+def check_pdf_file(toc_checker, pdf_path, remove=False):
+    """Check a downloaded PDF for a TOC, kept at module level so worker processes can run it
+
+    Args:
+        toc_checker (TOCChecker): Checker holding the keywords to look for
+        pdf_path (str): Path to the PDF file
+        remove (bool): Delete the file once it has been checked; unreadable PDFs are
+            always deleted
+
+    Returns:
+        bool: True if TOC is present, False otherwise
+        None: If the PDF is corrupted or cannot be opened
+    """
+    try:
+        toc_result = toc_checker.is_toc_present(pdf_path)
+    except BaseException:
+        # Only temporary files are cleaned up here; a cached PDF may still be fine
+        if remove:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(pdf_path)
+        raise
+
+    # A PDF that can't be opened is dropped from the cache so the next run fetches it again
+    if remove or toc_result is None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(pdf_path)
+    return toc_result
+
+
+# Set in each worker process by init_checker_worker
+_worker_toc_checker = None
+
+
+def init_checker_worker(toc_checker):
+    """Keep the checker in a worker process so it isn't sent along with every PDF
+
+    Args:
+        toc_checker (TOCChecker): Checker holding the keywords to look for
+    """
+    global _worker_toc_checker
+    _worker_toc_checker = toc_checker
+
+
+def check_pdf_in_worker(pdf_path, remove=False):
+    """Run check_pdf_file with the checker set up by init_checker_worker
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        remove (bool): Delete the file once it has been checked
+
+    Returns:
+        bool: True if TOC is present, False otherwise
+        None: If the PDF is corrupted or cannot be opened
+    """
+    return check_pdf_file(_worker_toc_checker, pdf_path, remove)
 
 
 def read_urls_from_file(file_path):
@@ -183,6 +365,23 @@ if __name__ == "__main__":
         nargs="+",
         help="Additional keywords to check for TOC"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=16,
+        help="Number of PDFs to download concurrently (default: 16)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Don't keep downloaded PDFs in {CACHE_DIR} for later runs"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of PDFs to check in parallel (default: number of CPUs)"
+    )
     args = parser.parse_args()
 
     urls = read_urls_from_file(args.url_file)
@@ -196,18 +395,67 @@ if __name__ == "__main__":
     if args.keywords:
         toc_checker.add_keywords(args.keywords)
 
-    for url in urls:
+    cache_dir = None if args.no_cache else CACHE_DIR
+    if cache_dir:
         try:
-            pdf_content = fetch_pdf(url)
-            if pdf_content:
-                toc_result = toc_checker.is_toc_present(pdf_content)
-                if toc_result is None:
-                    print(" ")
-                elif toc_result:
-                    print("Yes")
-                else:
-                    print("No")
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError:
+            cache_dir = None
+        if not cache_dir or not os.access(cache_dir, os.W_OK):
+            print(f"Warning: Can't write to {CACHE_DIR}, downloads won't be cached", file=sys.stderr)
+            cache_dir = None
+
+    # Each download thread hands its PDF to a worker process, so downloads overlap with
+    # checking and PDFs are parsed on all cores; results are still printed in input order
+    # Workers are spawned rather than forked: the pool starts them from inside download
+    # threads, and forking a process with other threads mid-request can deadlock
+    with ProcessPoolExecutor(max_workers=args.processes,
+                             mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_checker_worker,
+                             initargs=(toc_checker,)) as checker_pool, \
+            ThreadPoolExecutor(max_workers=args.workers) as downloader:
+
+        def process_url(url):
+            pdf_path = fetch_pdf(url, cache_dir)
+            if not pdf_path:
+                return " "
+            toc_result = checker_pool.submit(check_pdf_in_worker, pdf_path, not cache_dir).result()
+            if toc_result is None:
+                return " "
+            elif toc_result:
+                return "Yes"
             else:
-                print(" ")
-        except ValueError as e:
-            print(e)
+                return "No"
+
+        # Only a bounded window of URLs is in flight, so finished PDFs can't pile up far
+        # ahead of the one being printed
+        pending = deque()
+        url_iter = iter(urls)
+
+        # Repeated URLs share one future, so the same PDF is never downloaded, checked
+        # or removed from the cache by two threads at once
+        futures_by_url = {}
+
+        def submit_next():
+            url = next(url_iter, None)
+            if url is not None:
+                if url not in futures_by_url:
+                    futures_by_url[url] = downloader.submit(process_url, url)
+                pending.append(futures_by_url[url])
+
+        try:
+            for _ in range(2 * args.workers):
+                submit_next()
+
+            while pending:
+                future = pending.popleft()
+                submit_next()
+                try:
+                    print(future.result())
+                except ValueError as e:
+                    print(e)
+        except BaseException:
+            # Drop queued work (e.g. on Ctrl-C) instead of letting the pools run every remaining URL
+            downloader.shutdown(cancel_futures=True)
+            checker_pool.shutdown(cancel_futures=True)
+            raise